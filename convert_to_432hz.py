@@ -1,58 +1,275 @@
 import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import repeat
 import numpy as np
 from pydub import AudioSegment
-from scipy.fft import rfft, rfftfreq
+from pydub.utils import mediainfo_json
+import soundfile as sf
+import soxr
+from scipy.fft import next_fast_len, rfft, set_global_backend, set_workers
+from scipy.signal import decimate
 from tqdm import tqdm
+from tqdm.contrib.concurrent import process_map
 from colorama import Fore, Style, init
 import matplotlib.pyplot as plt
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; peak picking falls back to NumPy without it
+    njit = None
+
+try:
+    import pyfftw
+    import pyfftw.interfaces.cache
+    import pyfftw.interfaces.scipy_fft
+except ImportError:  # pyfftw is optional; scipy's own FFT is used without it
+    pyfftw = None
+
 # Initialize colorama
 init()
 
+# Seconds of audio analyzed from the middle of each file (0.25 Hz FFT resolution)
+ANALYSIS_SECONDS = 4
+
+# Approximate rate the analysis window is decimated to before the FFT (Nyquist well above 500 Hz)
+ANALYSIS_RATE = 4000
+
+# Formats libsndfile decodes in-process; anything else goes through pydub/ffmpeg
+SOUNDFILE_FORMATS = (".wav", ".flac")
+
+
+def interpolate_peak(k1, k2, k3, b1, b2, b3):
+    """
+    Returns the vertex of the parabola through the (frequency, magnitude) points (k1, b1), (k2, b2), (k3, b3).
+    """
+    denominator = 2.0 * (k1 * (b2 - b3) + k2 * (b3 - b1) + k3 * (b1 - b2))
+    if denominator == 0.0:
+        return k2
+    return (k1 ** 2 * (b2 - b3) + k2 ** 2 * (b3 - b1) + k3 ** 2 * (b1 - b2)) / denominator
+
+
+if njit is not None:
+    interpolate_peak = njit(cache=True)(interpolate_peak)
+
+    @njit(cache=True)
+    def peak_frequency(freqs, mags):
+        """
+        Returns the interpolated frequency of the strongest entry in mags[1:-1] in a single pass.
+        """
+        peak = 1
+        for k in range(2, mags.shape[0] - 1):
+            if mags[k] > mags[peak]:
+                peak = k
+        return interpolate_peak(freqs[peak - 1], freqs[peak], freqs[peak + 1],
+                                mags[peak - 1], mags[peak], mags[peak + 1])
+else:
+    def peak_frequency(freqs, mags):
+        """
+        Returns the interpolated frequency of the strongest entry in mags[1:-1].
+        """
+        peak = 1 + int(np.argmax(mags[1:-1]))
+        return interpolate_peak(*freqs[peak - 1:peak + 2], *mags[peak - 1:peak + 2])
+
+
+def segment_to_array(audio):
+    """
+    Converts a pydub AudioSegment to a float32 array of shape (frames, channels) scaled to [-1, 1].
+    """
+    # View pydub's raw PCM in place; scaling makes the only copy
+    dtype = {1: np.int8, 2: np.int16, 4: np.int32}[audio.sample_width]
+    samples = np.frombuffer(audio.raw_data, dtype=dtype).reshape(-1, audio.channels)
+    return np.multiply(samples, 1.0 / (1 << (8 * audio.sample_width - 1)), dtype=np.float32)
+
+
+def load_audio(file_path):
+    """
+    Loads an audio file as a float32 array of shape (frames, channels) scaled to [-1, 1].
+    """
+    if file_path.lower().endswith(SOUNDFILE_FORMATS):
+        return sf.read(file_path, dtype="float32", always_2d=True)
+
+    audio = AudioSegment.from_file(file_path)
+    return segment_to_array(audio), audio.frame_rate
+
+
+def load_window(file_path):
+    """
+    Decodes only the analysis window from the middle of an audio file, downmixed to mono.
+    Returns the window, its sample rate and the duration of the whole file in seconds.
+    """
+    if file_path.lower().endswith(SOUNDFILE_FORMATS):
+        with sf.SoundFile(file_path) as f:
+            sample_rate = f.samplerate
+            duration = f.frames / sample_rate
+            length = int(ANALYSIS_SECONDS * sample_rate)
+            f.seek(max(0, f.frames // 2 - length // 2))
+            samples = f.read(length, dtype="float32", always_2d=True)
+        return samples.mean(axis=1, dtype=np.float32), sample_rate, duration
+
+    info = mediainfo_json(file_path)
+    duration = float(info["format"]["duration"])
+    sample_rate = int(next(s for s in info["streams"] if s["codec_type"] == "audio")["sample_rate"])
+    start = max(0.0, duration / 2 - ANALYSIS_SECONDS / 2)
+
+    # -ss before -i seeks the input, so ffmpeg skips to the window instead of decoding up to it
+    command = [
+        AudioSegment.converter, "-v", "error",
+        "-ss", str(start), "-t", str(ANALYSIS_SECONDS), "-i", file_path,
+        "-f", "f32le", "-ac", "1", "-"  # Mono float32 PCM on stdout
+    ]
+    output = subprocess.run(command, stdin=subprocess.DEVNULL, capture_output=True, check=True).stdout
+    return np.frombuffer(output, dtype="<f4"), sample_rate, duration
+
+
+def middle_window(samples, sample_rate):
+    """
+    Returns the analysis window centered in an in-memory track.
+    """
+    length = int(ANALYSIS_SECONDS * sample_rate)
+    start = max(0, len(samples) // 2 - length // 2)
+    return samples[start:start + length]
+
+
+def resampled_window(samples, sample_rate, ratio):
+    """
+    Returns the mono analysis window of a track as it would sound after scaling its pitch by ratio,
+    resampling only the stretch of the track that lands in that window.
+    """
+    margin = sample_rate // 10  # Room for the resampler's filter at the segment edges
+    length = int(ANALYSIS_SECONDS * sample_rate * ratio) + 2 * margin
+    start = max(0, len(samples) // 2 - length // 2)
+    segment = samples[start:start + length].mean(axis=1, dtype=np.float32)
+    return middle_window(soxr.resample(segment, sample_rate, sample_rate / ratio), sample_rate)
+
+
+@lru_cache(maxsize=16)
+def hann_window(length):
+    """
+    Returns a float32 Hann window of the given length.
+    """
+    window = np.hanning(length).astype(np.float32)
+    window.flags.writeable = False  # Shared between callers through the cache
+    return window
+
+
+@lru_cache(maxsize=16)
+def fft_band_bins(n, sample_rate):
+    """
+    Returns the slice of n-point rfft bins covering 400–500 Hz plus one bin either side, and their frequencies.
+    """
+    # Bin k sits at k * sample_rate / n, so the band edges follow directly from n
+    num_bins = n // 2 + 1
+    first = int(np.ceil(400.0 * n / sample_rate))
+    last = min(int(np.floor(500.0 * n / sample_rate)), num_bins - 1)
+    if last < first:
+        band = slice(0, 0)
+    else:
+        band = slice(max(first - 1, 0), min(last + 2, num_bins))
+
+    band_freqs = np.arange(band.start, band.stop) * (sample_rate / n)
+    band_freqs.flags.writeable = False  # Shared between callers through the cache
+    return band, band_freqs
+
+
+def fft_band(samples, sample_rate):
+    """
+    Returns FFT bin frequencies and magnitudes covering 400–500 Hz plus one bin either side.
+    """
+    # Perform FFT to analyze frequency domain (zero-padded to a fast length)
+    n = next_fast_len(len(samples), real=True)
+    fft_vals = rfft(samples, n=n)  # complex64 for float32 input; threads follow set_workers
+
+    band, band_freqs = fft_band_bins(n, sample_rate)
+    return band_freqs, np.abs(fft_vals[band], dtype=np.float32)
+
+
+def top_partials(freqs, mags, count=5):
+    """
+    Returns the frequencies of the `count` strongest magnitudes, strongest first.
+    """
+    if count < len(mags):
+        indices = np.argpartition(-mags, count - 1)[:count]
+    else:
+        indices = np.arange(len(mags))
+    return list(freqs[indices[np.argsort(-mags[indices])]])
+
+
+def estimate_tuning(samples, sample_rate, harmonics=True):
+    """
+    Estimates the dominant frequency and strongest partials in 400–500 Hz from mono samples.
+    Pass harmonics=False to skip ranking the partials when only the dominant frequency is needed.
+    """
+    # Only 400–500 Hz matters, so downsample before the FFT
+    factor = int(sample_rate // ANALYSIS_RATE)
+    analysis_rate = sample_rate
+    if factor > 1:
+        samples = decimate(samples, factor, ftype="fir", zero_phase=True)
+        analysis_rate = sample_rate / factor
+
+    # Single precision is plenty for peak picking and halves the FFT's memory traffic
+    samples = samples.astype(np.float32, copy=False)
+
+    # Remove DC and taper the window so energy does not leak across the band
+    samples = (samples - samples.mean(dtype=np.float32)) * hann_window(len(samples))
+
+    freqs, mags = fft_band(samples, analysis_rate)
+
+    # No band, or no energy in it (e.g. silence): there is no peak to report
+    if len(mags) < 3 or mags[1:-1].max() == 0:
+        return None
+
+    # The outer entries lie just outside 400–500 Hz and only serve the peak interpolation
+    tuning_info = {"dominant_freq": float(peak_frequency(freqs, mags))}
+    if harmonics:
+        tuning_info["harmonics"] = top_partials(freqs[1:-1], mags[1:-1])  # Top 5 harmonics
+    return tuning_info
+
+
 def analyze_tuning(file_path):
     """
     Analyzes and extracts tuning information from an audio file.
     """
     try:
-        # Load audio file
-        audio = AudioSegment.from_file(file_path).set_channels(1)  # Mono
-        samples = np.array(audio.get_array_of_samples(), dtype=np.float32)
-        sample_rate = audio.frame_rate
-
-        # Perform FFT to analyze frequency domain
-        fft_vals = rfft(samples)
-        fft_freqs = rfftfreq(len(samples), d=1 / sample_rate)
-
-        # Focus on relevant range (400–500 Hz to capture harmonics)
-        valid_indices = (fft_freqs >= 400) & (fft_freqs <= 500)
-        filtered_fft_vals = np.abs(fft_vals[valid_indices])
-        filtered_fft_freqs = fft_freqs[valid_indices]
-
-        if len(filtered_fft_vals) > 0:
-            # Dominant frequency (weighted average)
-            dominant_freq = np.average(filtered_fft_freqs, weights=filtered_fft_vals)
-            return {
-                "dominant_freq": dominant_freq,
-                "sample_rate": sample_rate,
-                "duration": len(samples) / sample_rate,
-                "harmonics": list(filtered_fft_freqs[np.argsort(-filtered_fft_vals)[:5]])  # Top 5 harmonics
-            }
-        return None
+        # Only a representative window from the middle of the track is decoded
+        samples, sample_rate, duration = load_window(file_path)
+
+        tuning_info = estimate_tuning(samples, sample_rate)
+        if tuning_info:
+            tuning_info["sample_rate"] = sample_rate
+            tuning_info["duration"] = duration
+        return tuning_info
     except Exception as e:
         print(Fore.RED + f"Error analyzing {file_path}: {e}" + Style.RESET_ALL)
         return None
 
 
-def convert_to_432hz(file_path, output_path, max_iterations=3, tolerance=0.5):
+def write_wav(output_path, samples, sample_rate):
     """
-    Converts an audio file to 432 Hz by adjusting playback speed iteratively.
+    Writes float samples as a 16-bit PCM WAV file.
+    """
+    try:
+        # Resampling can overshoot full scale, so clip before converting to 16-bit PCM
+        np.clip(samples, -1.0, 1.0, out=samples)
+        sf.write(output_path, samples, sample_rate, format="WAV", subtype="PCM_16")
+        return True
+    except Exception as e:
+        print(Fore.RED + f"Error writing {output_path}: {e}" + Style.RESET_ALL)
+        return False
+
+
+def tune_to_432hz(file_path, max_iterations=3, tolerance=0.5):
+    """
+    Pitch-shifts an audio file towards 432 Hz in memory by adjusting playback speed iteratively.
+    Returns (samples, sample_rate, measured tuning or None), or None when the file is skipped.
     """
     try:
         # Detect initial tuning frequency
         tuning_info = analyze_tuning(file_path)
         if not tuning_info or "dominant_freq" not in tuning_info:
             print(Fore.RED + f"Could not analyze tuning for {file_path}. Skipping..." + Style.RESET_ALL)
-            return False
+            return None
 
         dominant_freq = tuning_info["dominant_freq"]
         print(Fore.YELLOW + f"Tuning info for {file_path}:" + Style.RESET_ALL)
@@ -62,29 +279,28 @@ def convert_to_432hz(file_path, output_path, max_iterations=3, tolerance=0.5):
         # Skip upward tuning if already below 432 Hz
         if dominant_freq < 432:
             print(Fore.GREEN + f"{file_path} is already below 432 Hz. No upward tuning applied." + Style.RESET_ALL)
-            return False
+            return None
+
+        # Load once; each pass re-measures the original shifted by the cumulative ratio in memory
+        samples, sample_rate = load_audio(file_path)
 
-        # Iteratively adjust playback speed
-        audio = AudioSegment.from_file(file_path)
+        # Nothing to correct (the loop below stops on the same check); the audio is written unchanged
+        if abs(dominant_freq - 432) <= tolerance:
+            print(Fore.GREEN + f"{file_path} is already within {tolerance} Hz of 432 Hz. Writing it unchanged." + Style.RESET_ALL)
+            return samples, sample_rate, dominant_freq
+
+        ratio = 1.0
         iteration = 0
 
         while iteration < max_iterations:
             speed_ratio = 432.0 / dominant_freq
-            print(Fore.YELLOW + f"Iteration {iteration + 1}: Applying speed ratio {speed_ratio:.6f}" + Style.RESET_ALL)
-
-            # Adjust playback speed
-            audio = audio._spawn(audio.raw_data, overrides={
-                "frame_rate": int(audio.frame_rate * speed_ratio)
-            }).set_frame_rate(audio.frame_rate)
+            ratio *= speed_ratio
+            print(Fore.YELLOW + f"Iteration {iteration + 1}: Applying speed ratio {ratio:.6f}" + Style.RESET_ALL)
 
-            # Save to temporary path for verification
-            temp_output_path = output_path.replace(".wav", f"_temp_{iteration}.wav")
-            audio.export(temp_output_path, format="wav")
-
-            # Re-analyze tuning
-            tuning_info = analyze_tuning(temp_output_path)
-            if not tuning_info or "dominant_freq" not in tuning_info:
-                print(Fore.RED + f"Could not re-analyze tuning for iteration {iteration + 1}. Skipping..." + Style.RESET_ALL)
+            # Re-analyze tuning on the shifted analysis window only; the full track is resampled once below
+            tuning_info = estimate_tuning(resampled_window(samples, sample_rate, ratio), sample_rate, harmonics=False)
+            if not tuning_info:
+                print(Fore.RED + f"Could not re-analyze tuning for iteration {iteration + 1}." + Style.RESET_ALL)
                 break
 
             dominant_freq = tuning_info["dominant_freq"]
@@ -92,25 +308,94 @@ def convert_to_432hz(file_path, output_path, max_iterations=3, tolerance=0.5):
 
             # Check if tuning is within tolerance
             if abs(dominant_freq - 432) <= tolerance:
-                print(Fore.GREEN + f"Verification successful: {output_path} tuned to {dominant_freq:.2f} Hz." + Style.RESET_ALL)
-                os.rename(temp_output_path, output_path)  # Rename temp file to final output
-                return True
+                break
 
             iteration += 1
 
-        # If iterations fail, save the last attempt
-        print(Fore.RED + f"Verification failed after {max_iterations} iterations. Last tuning: {dominant_freq:.2f} Hz." + Style.RESET_ALL)
-        audio.export(output_path, format="wav")
-        return False
+        # Stretch by 1 / ratio and play back at the original rate, scaling pitch by ratio
+        shifted = soxr.resample(samples, sample_rate, sample_rate / ratio)
+        return shifted, sample_rate, (dominant_freq if tuning_info else None)
     except Exception as e:
         print(Fore.RED + f"Error converting {file_path}: {e}" + Style.RESET_ALL)
+        return None
+
+
+def save_tuned(output_path, samples, sample_rate, dominant_freq, tolerance=0.5):
+    """
+    Writes a tuned buffer and reports whether its measured tuning is within tolerance of 432 Hz.
+    """
+    if not write_wav(output_path, samples, sample_rate):
+        return False
+
+    # The tuning loop already reported a failed re-analysis
+    if dominant_freq is None:
+        return False
+
+    if abs(dominant_freq - 432) <= tolerance:
+        print(Fore.GREEN + f"Verification successful: {output_path} tuned to {dominant_freq:.2f} Hz." + Style.RESET_ALL)
+        return True
+
+    print(Fore.RED + f"Verification failed: {output_path} measured at {dominant_freq:.2f} Hz." + Style.RESET_ALL)
+    return False
+
+
+def convert_to_432hz(file_path, output_path, max_iterations=3, tolerance=0.5):
+    """
+    Converts an audio file to 432 Hz by adjusting playback speed iteratively.
+    """
+    tuned = tune_to_432hz(file_path, max_iterations, tolerance)
+    if tuned is None:
         return False
+    return save_tuned(output_path, *tuned, tolerance)
+
 
+# Whether use_fftw_backend has already installed FFTW in this process
+_fftw_installed = False
 
 
-def batch_convert(input_folder, output_folder):
+def use_fftw_backend():
+    """
+    Routes scipy.fft through FFTW with plan caching so a batch of files reuses its FFT plans.
+    Only configures the backend once per process. Returns False when pyfftw is not installed.
+    """
+    global _fftw_installed
+    if pyfftw is None:
+        return False
+    if _fftw_installed:
+        return True
+
+    # Analysis windows have a fixed length per sample rate, so measured plans pay off across a batch
+    pyfftw.config.PLANNER_EFFORT = "FFTW_MEASURE"
+    pyfftw.interfaces.cache.enable()
+    pyfftw.interfaces.cache.set_keepalive_time(60)
+    set_global_backend(pyfftw.interfaces.scipy_fft)
+    _fftw_installed = True
+    return True
+
+
+def _batch_output_path(file_path, input_folder, output_folder):
+    """
+    Mirrors a file's path relative to the input folder under the output folder.
+    """
+    relative_path = os.path.relpath(file_path, input_folder)
+    output_path = os.path.join(output_folder, relative_path)
+    return os.path.splitext(output_path)[0] + "_432Hz.wav"
+
+
+def _convert_one(file_path, input_folder, output_folder):
+    """
+    Converts one file of a batch, mirroring its relative path under the output folder.
+    """
+    # Pool workers may not inherit the parent's backend; this is a no-op once installed
+    use_fftw_backend()
+    return convert_to_432hz(file_path, _batch_output_path(file_path, input_folder, output_folder))
+
+
+def batch_convert(input_folder, output_folder, workers=1):
     """
     Converts all supported audio files in a folder to 432 Hz.
+    Files are processed in parallel across `workers` processes (None uses all cores).
+    Returns the result of each file's conversion, in order.
     """
     supported_formats = (".wav", ".mp3", ".flac", ".aac")
     audio_files = [
@@ -121,14 +406,39 @@ def batch_convert(input_folder, output_folder):
 
     if not audio_files:
         print(Fore.RED + "No audio files found in the specified folder." + Style.RESET_ALL)
-        return
+        return []
+
+    if workers == 1:
+        use_fftw_backend()  # Once for the whole serial batch
+
+        # Write each result in the background while the next file is tuned, keeping at most
+        # one write (and its full-track buffer) in flight
+        results = []
+        pending = None
+        with ThreadPoolExecutor(max_workers=1) as writer:
+            for file_path in tqdm(audio_files, desc="Processing files"):
+                tuned = tune_to_432hz(file_path)
+                if pending is not None:
+                    results.append(pending.result())
+                    pending = None
+
+                if tuned is None:
+                    results.append(False)
+                    continue
+
+                output_path = _batch_output_path(file_path, input_folder, output_folder)
+                pending = writer.submit(save_tuned, output_path, *tuned)
 
-    for file_path in tqdm(audio_files, desc="Processing files"):
-        relative_path = os.path.relpath(file_path, input_folder)
-        output_path = os.path.join(output_folder, relative_path)
-        output_path = os.path.splitext(output_path)[0] + "_432Hz.wav"
+            if pending is not None:
+                results.append(pending.result())
+        return results
 
-        convert_to_432hz(file_path, output_path)
+    # Each process already occupies a core, so keep their FFTs single-threaded
+    with set_workers(1):
+        return process_map(
+            _convert_one, audio_files, repeat(input_folder), repeat(output_folder),
+            max_workers=workers or os.cpu_count(), chunksize=1, desc="Processing files"
+        )
 
 
 def main():
@@ -169,8 +479,11 @@ def main():
         elif choice == "3":
             input_folder = input(Fore.GREEN + "Enter the path of the folder containing audio files: " + Style.RESET_ALL)
             output_folder = input(Fore.GREEN + "Enter the path of the folder to save converted files: " + Style.RESET_ALL)
-            if os.path.isdir(input_folder):
-                batch_convert(input_folder, output_folder)
+            workers = input(Fore.GREEN + "Enter the number of parallel workers (blank for 1, 0 for all cores): " + Style.RESET_ALL).strip() or "1"
+            if not workers.isdigit():
+                print(Fore.RED + "Invalid number of workers. Please try again." + Style.RESET_ALL)
+            elif os.path.isdir(input_folder):
+                batch_convert(input_folder, output_folder, int(workers) or None)
             else:
                 print(Fore.RED + "Invalid folder path. Please try again." + Style.RESET_ALL)
 
@@ -183,4 +496,6 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    # Let the tuning FFTs use every core
+    with set_workers(-1):
+        main()